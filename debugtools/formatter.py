@@ -1,23 +1,30 @@
 """
 An enhanced ``pprint.pformat`` that prints data structures in a readable HTML style.
 """
+import hashlib
 import inspect
 import re
 import sys
 import types
+from contextlib import contextmanager
+from contextvars import ContextVar
 from itertools import chain
 from pprint import PrettyPrinter, _StringIO
 
 import django.template.loader  # avoid recursive import issues with loader_tags
+from django.conf import settings
 from django.core.exceptions import MultipleObjectsReturned, ObjectDoesNotExist
-from django.db import IntegrityError
+from django.core.files.base import File
+from django.db import IntegrityError, connections
 from django.db.models.base import Model
+from django.db.models.fields.files import FieldFile
 from django.db.models.manager import Manager
 from django.db.models.query import QuerySet
 from django.forms.forms import BaseForm
+from django.forms.formsets import BaseFormSet
 from django.template.loader_tags import BlockNode
 from django.utils.encoding import smart_str
-from django.utils.functional import Promise
+from django.utils.functional import Promise, cached_property
 from django.utils.html import escape
 from django.utils.safestring import mark_safe
 
@@ -53,6 +60,14 @@ HANDLED_EXCEPTIONS = (
     RuntimeError,
 )
 
+BINARY_TYPES = (bytes, bytearray, memoryview)
+
+# The default for settings.DEBUGTOOLS_MAX_VALUE_LENGTH
+MAX_VALUE_LENGTH = 2000
+
+# Set while formatting a value with full=True, which prints large values completely.
+_print_full_values = ContextVar("debugtools_print_full_values", default=False)
+
 RE_SQL_NL = re.compile(r"\b(FROM|LEFT OUTER|RIGHT|LEFT|INNER|OUTER|WHERE|ORDER BY|GROUP BY)\b")
 RE_SQL = re.compile(
     r"\b(SELECT|UPDATE|DELETE"
@@ -74,11 +89,17 @@ def pformat_sql_html(sql):
     return sql
 
 
-def pformat_django_context_html(object):
+def pformat_django_context_html(object, full=False):
     """
     Dump a variable to a HTML string with sensible output for template context fields.
     It filters out all fields which are not usable in a template context.
+    With ``full=True``, the properties and methods of model instances are evaluated too,
+    and the widgets of forms are rendered. Large strings and binary values are printed completely.
     """
+    if full and not _print_full_values.get():
+        with _printing_full_values():
+            return pformat_django_context_html(object, full=True)
+
     if isinstance(object, QuerySet):
         text = ""
         lineno = 0
@@ -92,7 +113,9 @@ def pformat_django_context_html(object):
     elif isinstance(object, Manager):
         return mark_safe("    (use <kbd>.all</kbd> to read it)")
     elif isinstance(object, string_types):
-        return escape(repr(object))
+        return escape(_repr_str(object))
+    elif isinstance(object, BINARY_TYPES + (File,)):
+        return escape(repr(_format_value(object)))
     elif isinstance(object, Promise):
         # lazy() object
         return escape(_format_lazy(object))
@@ -101,6 +124,12 @@ def pformat_django_context_html(object):
         return _format_dict(object)
     elif isinstance(object, list):
         return _format_list(object)
+    elif isinstance(object, Model):
+        return _format_object(object) if full else _format_model(object)
+    elif isinstance(object, BaseForm):
+        return _format_form(object, full=full)
+    elif isinstance(object, BaseFormSet):
+        return _format_formset(object, full=full)
     elif hasattr(object, "__dict__"):
         return _format_object(object)
     else:
@@ -109,6 +138,32 @@ def pformat_django_context_html(object):
         return _style_text(text)
 
 
+def pformat_dict_items(dict, full=False):
+    """
+    Format the items of a dictionary as plain text, sorted by key.
+    This returns a list of ``(key, value, key_text, value_text)`` tuples,
+    so the text can be rendered as HTML by :func:`pformat_dict_items_html` or client-side.
+    With ``full=True``, large strings and binary values are printed completely.
+    """
+    if full and not _print_full_values.get():
+        with _printing_full_values():
+            return pformat_dict_items(dict)
+
+    return [
+        (key, value) + _format_dict_item_text(key, value) for key, value in sorted(dict.items())
+    ]
+
+
+def pformat_dict_items_html(items):
+    """
+    Render the output of :func:`pformat_dict_items` as HTML.
+    """
+    if not items:
+        return mark_safe("   <small>(<var>empty dict</var>)</small>")
+    else:
+        return mark_safe("<br/>".join(_format_dict_item_html(*item) for item in items))
+
+
 def pformat_dict_summary_html(dict):
     """
     Briefly print the dictionary keys.
@@ -177,9 +232,7 @@ def _style_text(text):
     text = RE_CLASS_REPR.sub(r"\g<1><small>&lt;<var>\g<2> class</var>&gt;</small>", text)
 
     # Since Django's WSGIRequest does a pprint like format for it's __repr__, make that styling consistent
-    text = RE_REQUEST_FIELDNAME.sub(
-        '\\g<1>:\n   <strong style="color: #222;">\\g<2></strong>: ', text
-    )
+    text = RE_REQUEST_FIELDNAME.sub("\\g<1>:\n   <strong>\\g<2></strong>: ", text)
     text = RE_REQUEST_CLEANUP1.sub(r"\g<1>", text)
     text = RE_REQUEST_CLEANUP2.sub(")", text)
 
@@ -198,16 +251,13 @@ def _format_object(object):
 
     # Remove private and protected variables
     # Filter needless exception classes which are added to each model.
-    # Filter unremoved form.Meta (unline model.Meta) which makes no sense either
     is_model = isinstance(object, Model)
-    is_form = isinstance(object, BaseForm)
     attrs = {
         k: v
         for k, v in attrs
         if not k.startswith("_")
         and not getattr(v, "alters_data", False)
         and not (is_model and k in ("DoesNotExist", "MultipleObjectsReturned"))
-        and not (is_form and k in ("Meta",))
     }
 
     # Add members which are not found in __dict__.
@@ -273,15 +323,228 @@ def _format_object(object):
     if hasattr(object, "__len__"):
         attrs["__len__"] = len(object)
 
-    # Add known __getattr__ members which are useful for template designers.
-    if isinstance(object, BaseForm):
-        for field_name in list(object.fields.keys()):
-            attrs[field_name] = object[field_name]
-        del attrs["__getitem__"]
+    return _format_dict(attrs)
+
+
+def _format_model(instance):
+    """
+    Print the model fields, based on the ``_meta`` information.
+    Unlike ``_format_object()``, this doesn't access any descriptors, so no queries are performed.
+    Related objects are only displayed when they are already loaded (e.g. by ``select_related()``).
+    Properties and methods are listed, but not called.
+    Use ``{% print instance full %}`` to evaluate them.
+    """
+    attrs = {"pk": instance.pk}
+    deferred = instance.get_deferred_fields()
+    opts = instance._meta
+
+    for field in opts.concrete_fields:
+        if field.attname in deferred:
+            attrs[field.name] = LiteralStr("<deferred>")
+        elif field.is_relation:
+            value = getattr(instance, field.attname)
+            attrs[field.attname] = value
+            if field.is_cached(instance):
+                attrs[field.name] = _format_loaded_value(field.get_cached_value(instance))
+            elif value is None:
+                attrs[field.name] = None
+            else:
+                attrs[field.name] = LiteralStr(f"<not loaded: pk={value!r}>")
+        else:
+            attrs[field.name] = getattr(instance, field.attname)
+
+    prefetched = getattr(instance, "_prefetched_objects_cache", {})
+    for field in opts.many_to_many:
+        attrs[field.name] = _format_related_manager(field.name, prefetched)
+
+    for rel in opts.related_objects:
+        name = rel.get_accessor_name()
+        if not name:
+            continue  # related_name="+"
+        elif rel.one_to_one:
+            if rel.is_cached(instance):
+                attrs[name] = _format_loaded_value(rel.get_cached_value(instance))
+            else:
+                attrs[name] = LiteralStr("<not loaded>")
+        elif rel.many_to_many:
+            attrs[name] = _format_related_manager(rel.field.related_query_name(), prefetched)
+        else:
+            attrs[name] = _format_related_manager(name, prefetched)
+
+    # List the other attributes which the template could access.
+    for cls in type(instance).__mro__:
+        if cls is Model:
+            break
+        for name, value in cls.__dict__.items():
+            if name.startswith("_") or name in attrs:
+                continue
+            elif isinstance(value, (property, cached_property)):
+                if name in instance.__dict__:
+                    # cached_property that was evaluated.
+                    attrs[name] = _format_loaded_value(instance.__dict__[name])
+                else:
+                    attrs[name] = LiteralStr("<property, not evaluated>")
+            elif isinstance(value, types.FunctionType) and not getattr(
+                value, "alters_data", False
+            ):
+                if not _is_unsafe_name(name):
+                    attrs[name] = LiteralStr("<method, not called>")
+
+    attrs["__str__"] = _format_model_str(instance)
+    return _format_dict(attrs)
+
+
+def _format_loaded_value(value):
+    # Related objects are printed like Model.__repr__(), but their __str__() can't query either.
+    if isinstance(value, Model):
+        text = _format_model_str(value)
+        if not isinstance(text, str):
+            text = repr(text)  # LiteralStr
+        return LiteralStr(f"<{value.__class__.__name__}: {text}>")
+    elif isinstance(value, list):
+        return [_format_loaded_value(item) for item in value]
+    else:
+        return value
+
+
+def _format_model_str(instance):
+    # The __str__() may read a relation, so it's called while the database is blocked.
+    try:
+        with _block_queries():
+            return _try_call(lambda: smart_str(instance))
+    except QueryBlocked:
+        return LiteralStr("<not evaluated, performs queries>")
+
+
+@contextmanager
+def _block_queries():
+    # Replacing the cursor (like SimpleTestCase does) avoids that the query is executed or logged.
+    patched = []
+    try:
+        for connection in connections.all():
+            for name in ("cursor", "chunked_cursor"):
+                patched.append((connection, name, connection.__dict__.get(name)))
+                setattr(connection, name, _blocked_cursor)
+        yield
+    finally:
+        for connection, name, previous in reversed(patched):
+            if previous is None:
+                delattr(connection, name)
+            else:
+                setattr(connection, name, previous)  # e.g. the cursor of the debug toolbar.
+
+
+def _blocked_cursor(*args, **kwargs):
+    raise QueryBlocked()
+
+
+def _format_related_manager(cache_name, prefetched):
+    try:
+        queryset = prefetched[cache_name]
+    except KeyError:
+        return LiteralStr("<RelatedManager manager>")
+    else:
+        # prefetch_related() filled the result cache.
+        return _format_loaded_value(list(queryset))
+
+
+# Form attributes which are displayed in a custom way by _format_form().
+FORM_SKIPPED_ATTRS = ("fields", "data", "files", "initial", "renderer", "cleaned_data")
+
+
+def _format_form(form, full=False):
+    """
+    Print the form fields, without validating the form or rendering the widgets.
+    Evaluating ``form.errors`` would validate the form, and ``form[name]`` renders the widget.
+    Both are avoided here, so printing large forms is fast and has no side effects.
+    With ``full=True``, the widgets are rendered, which also validates a bound form.
+    """
+    attrs = {
+        k: v
+        for k, v in form.__dict__.items()
+        if not k.startswith("_") and k not in FORM_SKIPPED_ATTRS
+    }
+    attrs["fields"] = {name: _format_form_field(field) for name, field in form.fields.items()}
+    attrs["initial"] = form.initial
+    if form.is_bound:
+        attrs["data"] = form.data
+        if form.files:
+            attrs["files"] = form.files
+
+    if full:
+        attrs["widgets"] = _format_form_widgets(form)
+
+    attrs["errors"] = _format_form_errors(form)
+    if hasattr(form, "cleaned_data"):
+        attrs["cleaned_data"] = form.cleaned_data
+
+    # Rendering the fields happens on request, e.g. {% print form.name %} or {% print form full %}
+    attrs["__getitem__"] = LiteralStr("<use form.field_name to render a field>")
+    attrs["__iter__"] = LiteralStr("<iterator object>")
+    return _format_dict(attrs)
+
+
+def _format_formset(formset, full=False):
+    """
+    Print the formset, with a brief summary of each form.
+    With ``full=True``, the widgets of each form are rendered too.
+    """
+    attrs = {
+        "prefix": formset.prefix,
+        "is_bound": formset.is_bound,
+        "initial": formset.initial,
+    }
+    if full:
+        # Rendering the widgets validates the forms, so this happens before reading the errors.
+        attrs["widgets"] = [_format_form_widgets(form) for form in formset.forms]
+
+    if formset._errors is None:
+        attrs["errors"] = LiteralStr("<not validated yet>")
+    else:
+        attrs["errors"] = [_format_form_errors(form) for form in formset.forms]
+        attrs["non_form_errors"] = list(formset._non_form_errors or ())
 
+    attrs["forms"] = [_format_form_summary(form) for form in formset.forms]
+    attrs["__iter__"] = LiteralStr("<iterator object>")
+    attrs["__len__"] = len(attrs["forms"])
     return _format_dict(attrs)
 
 
+def _format_form_field(field):
+    flags = [f"widget={field.widget.__class__.__name__}"]
+    if field.required:
+        flags.append("required")
+    if field.disabled:
+        flags.append("disabled")
+    return LiteralStr(f"<{field.__class__.__name__}: {', '.join(flags)}>")
+
+
+def _format_form_widgets(form):
+    return {name: _try_call(lambda: str(form[name])) for name in form.fields}
+
+
+def _format_form_errors(form):
+    if form._errors is None:
+        return LiteralStr("<not validated yet>")
+    else:
+        return {name: list(errors) for name, errors in form._errors.items()}
+
+
+def _format_form_summary(form):
+    if form._errors is None:
+        state = "not validated"
+    elif form._errors:
+        state = f"errors in {', '.join(form._errors.keys())}"
+    else:
+        state = "valid"
+
+    bound = "bound" if form.is_bound else "unbound"
+    return LiteralStr(
+        f"<{form.__class__.__name__}: prefix={form.prefix!r}, {bound}, "
+        f"{len(form.fields)} fields, {state}>"
+    )
+
+
 def _format_list(list):
     list = list[:]
     for i, value in enumerate(list):
@@ -292,34 +555,38 @@ def _format_list(list):
 
 
 def _format_dict(dict):
-    if not dict:
-        return mark_safe("   <small>(<var>empty dict</var>)</small>")
-    else:
-        html = []
-        for key, value in sorted(dict.items()):
-            html.append(_format_dict_item(key, value))
-        return mark_safe("<br/>".join(html))
+    return pformat_dict_items_html(pformat_dict_items(dict))
 
 
 def _format_dict_item(key, value):
+    return _format_dict_item_html(key, value, *_format_dict_item_text(key, value))
+
+
+def _format_dict_item_text(key, value):
     if isinstance(key, string_types):
-        key_html = key
-        key_len = len(key)
+        key_text = key
     else:
-        key_html = DebugPrettyPrinter().pformat(_format_value(key))
-        key_len = len(key_html)
-        key_html = _style_text(key_html)
+        key_text = DebugPrettyPrinter().pformat(_format_value(key))
 
     if not isinstance(value, DICT_EXPANDED_TYPES):
-        value = _style_text(
-            DebugPrettyPrinter(width=200).pformat_sub(
-                _format_value(value), indent=key_len + 5, level=1
-            )
+        value_text = DebugPrettyPrinter(width=200).pformat_sub(
+            _format_value(value), indent=len(key_text) + 5, level=1
         )
+    elif isinstance(value, string_types):
+        value_text = _repr_str(value)
+    else:
+        value_text = repr(value)
+    return key_text, value_text
+
+
+def _format_dict_item_html(key, value, key_text, value_text):
+    key_html = key if isinstance(key, string_types) else _style_text(key_text)
+    if not isinstance(value, DICT_EXPANDED_TYPES):
+        value_html = _style_text(value_text)
     else:
-        value = escape(repr(value))
+        value_html = escape(value_text)
 
-    return f'   <strong style="color: #222;">{key_html}</strong>: {value}'
+    return f"   <strong>{key_html}</strong>: {value_html}"
 
 
 def _format_value(value):
@@ -329,10 +596,95 @@ def _format_value(value):
     elif isinstance(value, Promise):
         # lazy() object
         return _format_lazy(value)
+    elif isinstance(value, File):
+        return _format_file(value)
+    elif isinstance(value, (string_types,) + BINARY_TYPES):
+        return _format_large_value(value) or value
     else:
         return value
 
 
+@contextmanager
+def _printing_full_values():
+    token = _print_full_values.set(True)
+    try:
+        yield
+    finally:
+        _print_full_values.reset(token)
+
+
+def _get_max_value_length():
+    if _print_full_values.get():
+        return None
+    # Set DEBUGTOOLS_MAX_VALUE_LENGTH = None to print all data.
+    return getattr(settings, "DEBUGTOOLS_MAX_VALUE_LENGTH", MAX_VALUE_LENGTH)
+
+
+def _repr_str(value):
+    return repr(_format_large_value(value) or value)
+
+
+def _format_large_value(value):
+    """
+    Summarize a large string or binary value.
+    Only the head and tail are included, which avoids copying (and escaping) the whole value.
+    This returns ``None`` when the value is small enough to print.
+    """
+    max_length = _get_max_value_length()
+    if not max_length:
+        return None
+
+    if isinstance(value, string_types):
+        if len(value) <= max_length:
+            return None
+        half = max_length // 2
+        # value[-0:] would be the whole value.
+        head, tail = value[:half], value[len(value) - half :]
+        # Strings can contain lone surrogates (e.g. from os.fsdecode()), which UTF-8 doesn't allow.
+        digest = _get_digest(
+            value[i : i + 65536].encode("utf-8", "surrogatepass")
+            for i in range(0, len(value), 65536)
+        )
+        size = f"{len(value)} characters"
+    else:
+        view = value if isinstance(value, memoryview) else memoryview(value)
+        if not view.c_contiguous:
+            return None
+        view = view.cast("B")
+        if view.nbytes <= max_length:
+            return None
+        half = max_length // 2
+        head, tail = bytes(view[:half]), bytes(view[view.nbytes - half :])
+        digest = _get_digest((view,))
+        size = f"{view.nbytes} bytes"
+
+    return LiteralStr(
+        f"<{value.__class__.__name__} of {size}, sha1={digest}: {head!r} ... {tail!r}>"
+    )
+
+
+def _get_digest(chunks):
+    digest = hashlib.sha1()
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _format_file(value):
+    """
+    Print the file details, without reading the file contents.
+    """
+    details = [f"name={value.name!r}"]
+    if not isinstance(value, FieldFile):
+        # FieldFile.size would access the storage backend.
+        size = _try_call(lambda: value.size)
+        details.append(f"size={size!r}")
+    content_type = getattr(value, "content_type", None)
+    if content_type:
+        details.append(f"content_type={content_type!r}")
+    return LiteralStr(f"<{value.__class__.__name__}: {', '.join(details)}>")
+
+
 def _format_lazy(value):
     """
     Expand a _("TEST") call to something meaningful.
@@ -387,6 +739,12 @@ def _try_call(func, extra_exceptions=(), return_exceptions=False):
             return _format_exception(e)
 
 
+class QueryBlocked(Exception):
+    """
+    Raised when a query happens while formatting a model, which shouldn't query the database.
+    """
+
+
 class LiteralStr:
     """
     A trick to make pformat() print a custom string without quotes.
@@ -419,6 +777,7 @@ class DebugPrettyPrinter(PrettyPrinter):
         Could be a dictionary key, value, etc..
         """
         try:
+            object = _format_value(object)
             return PrettyPrinter.format(self, object, context, maxlevels, level)
         except HANDLED_EXCEPTIONS as e:
             return _format_exception(e), True, False
@@ -428,6 +787,7 @@ class DebugPrettyPrinter(PrettyPrinter):
         Recursive part of the formatting
         """
         try:
+            object = _format_value(object)
             PrettyPrinter._format(self, object, stream, indent, allowance, context, level)
         except Exception as e:
             stream.write(_format_exception(e))
@@ -1 +1,2 @@
+from debugtools.middleware.queryattributionmiddleware import QueryAttributionMiddleware
 from debugtools.middleware.xviewmiddleware import XViewMiddleware
@@ -0,0 +1,30 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from debugtools.utils.queries import QueryRecorder
+
+
+class QueryAttributionMiddleware:
+    """
+    Records which template line caused each query.
+
+    When ``DEBUG = True``, all queries are tagged with the template name, line number
+    and expression that was rendered while the query was executed.
+    The ``{% print_queries %}`` tag uses this to group the queries by template location.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DEBUG:
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        request._query_recorder = recorder
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            return self.get_response(request)
@@ -1,12 +1,23 @@
+import tracemalloc
+from time import perf_counter
+
 from debug_toolbar.panels import Panel
+from django.conf import settings
+from django.db import connections
 from django.db.models import Model
 from django.forms import BaseForm
 from django.forms.models import BaseFormSet
+from django.urls import Resolver404, resolve
 from django.utils.translation import gettext_lazy as _
 from django.views.generic import View
 
+from debugtools.utils.memory import get_context_sizes
+from debugtools.utils.stats import registry
 from debugtools.utils.xview import get_used_template, get_view_name
 
+# The default for settings.DEBUGTOOLS_PANEL_CONTEXT_SIZES
+PANEL_CONTEXT_SIZES = False
+
 
 class ViewPanel(Panel):
     """
@@ -20,13 +31,33 @@ class ViewPanel(Panel):
         super().__init__(*args, **kwargs)
         self.view_module = None
         self.view_name = None
+        self.start_time = None
+        self.start_queries = None
+        self.start_memory = None
+
+    def process_request(self, request):
+        # The view is resolved within the response handling, only the starting point is taken here.
+        self.start_time = perf_counter()
+        self.start_queries = _count_queries()
+        if tracemalloc.is_tracing():
+            # Only measured when tracing is enabled, e.g. by PYTHONTRACEMALLOC=1
+            self.start_memory = tracemalloc.get_traced_memory()[0]
+        return super().process_request(request)
+
+    def generate_stats(self, request, response):
+        duration = (perf_counter() - self.start_time) * 1000
+        end_queries = _count_queries()
+        if end_queries is None or self.start_queries is None:
+            num_queries = None
+        else:
+            num_queries = max(end_queries - self.start_queries, 0)
 
-    def process_view(self, request, view_func, view_args, view_kwargs):
         # Store the information about the view being called.
-        self.view_module = view_func.__module__
-        self.view_name = get_view_name(view_func)
+        view_func = _get_view_func(request)
+        if view_func is not None:
+            self.view_module = view_func.__module__
+            self.view_name = get_view_name(view_func)
 
-    def process_response(self, request, response):
         # Find out what template was used.
         template, choices = get_used_template(response)
 
@@ -36,6 +67,16 @@ class ViewPanel(Panel):
         else:
             context_data = None
 
+        # Add the request to the statistics of all previous requests.
+        if self.view_name:
+            registry.add(
+                view_name=f"{self.view_module}.{self.view_name}",
+                template=template,
+                duration=duration,
+                num_queries=num_queries,
+                template_choices=choices,
+            )
+
         self.record_stats(
             {
                 "view_module": self.view_module,
@@ -43,9 +84,18 @@ class ViewPanel(Panel):
                 "view_data": self._get_view_data(context_data) if context_data else None,
                 "template": template,
                 "template_choices": choices,
+                "memory_delta": self._get_memory_delta(),
+                "view_stats": registry.get_view_stats(),
+                "template_stats": registry.get_template_stats(),
             }
         )
 
+    def _get_memory_delta(self):
+        # The traced memory is process-wide, so this includes the other threads of the server too.
+        if self.start_memory is None or not tracemalloc.is_tracing():
+            return None
+        return tracemalloc.get_traced_memory()[0] - self.start_memory
+
     def _get_view_data(self, context_data):
         """
         Extract the used view from the TemplateResponse context (ContextMixin)
@@ -64,21 +114,20 @@ class ViewPanel(Panel):
             "model": _get_view_model(view),
             "form": _get_form_class(view),
             "template_context": template_context,
+            "context_sizes": get_context_sizes(context_data) if _show_context_sizes() else None,
         }
 
     @property
     def title(self):
-        if self.view_name:
-            return f"{self.nav_title} ({self.view_name})"
+        view_name = self.get_stats().get("view_name")
+        if view_name:
+            return f"{self.nav_title} ({view_name})"
         else:
             return self.nav_subtitle
 
     @property
     def nav_subtitle(self):
-        if self.view_name:
-            return self.view_name
-        else:
-            return ""
+        return self.get_stats().get("view_name") or ""
 
 
 def _get_form_class(view):
@@ -109,5 +158,29 @@ def _get_view_model(view):
         return _format_path(model)
 
 
+def _show_context_sizes():
+    # Measuring walks all objects of the context, so this only happens on request.
+    return getattr(settings, "DEBUGTOOLS_PANEL_CONTEXT_SIZES", PANEL_CONTEXT_SIZES)
+
+
+def _get_view_func(request):
+    # The resolver_match is only set when a URL pattern matched, e.g. not for a 404 page.
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+    return match.func
+
+
+def _count_queries():
+    # The queries are only logged when DEBUG = True, otherwise the count is unknown.
+    all_connections = connections.all()
+    if not all(connection.queries_logged for connection in all_connections):
+        return None
+    return sum(len(connection.queries_log) for connection in all_connections)
+
+
 def _format_path(cls):
     return f"{cls.__module__}.{cls.__name__}"
@@ -4,4 +4,279 @@
  *
  * (C) 2008-2012 Diederik van der Boor, BSD licensed.
  */
-jQuery.fn.debug = function(p) { window.console && console.log((p || '') + this.selector, this); return this; };
+if (window.jQuery) {
+  jQuery.fn.debug = function(p) { window.console && console.log((p || '') + this.selector, this); return this; };
+}
+
+
+/**
+ * Client-side rendering of large {% print %} and {% print_queries %} output.
+ * The data is embedded once as JSON, and only the rows in view are added to the DOM.
+ * Rows are cut off at the edge; clicking a row displays the complete text below the list.
+ */
+(function(window, document) {
+  if (window.DebugTools) {
+    return;  // Script included twice.
+  }
+
+  var ROW_HEIGHT = 18;
+  var MAX_HEIGHT = 540;
+  var OVERSCAN = 20;
+
+  var STYLE = (
+    '.dt-virtual { position: relative; overflow: auto; }' +
+    '.dt-virtual .dt-rows { position: relative; }' +
+    '.dt-virtual .dt-row { position: absolute; left: 0; right: 0; height: ' + ROW_HEIGHT + 'px; line-height: ' + ROW_HEIGHT + 'px; white-space: pre; overflow: hidden; text-overflow: ellipsis; cursor: pointer; }' +
+    '.dt-virtual .dt-row:hover { background-color: #eaeaea; }' +
+    '.dt-virtual .dt-toggle { display: inline-block; width: 12px; color: #333; text-decoration: none; cursor: pointer; }' +
+    '.dt-search { margin: 0 0 6px 0; font-size: 12px; }' +
+    '.dt-detail { white-space: pre-wrap; margin-top: 6px; }'
+  );
+
+  var RE_SQL_NL = /\b(FROM|LEFT OUTER|RIGHT|LEFT|INNER|OUTER|WHERE|ORDER BY|GROUP BY)\b/g;
+  var RE_SQL = /\b(SELECT|UPDATE|DELETE|COUNT|AVG|MAX|MIN|CASE|FROM|SET|ORDER|GROUP|BY|ASC|DESC|LIMIT|WHERE|AND|OR|IN|LIKE|BETWEEN|IS|NULL|LEFT|RIGHT|INNER|OUTER|JOIN|HAVING)\b/g;
+
+  function escapeHtml(text) {
+    return String(text).replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;')
+      .replace(/"/g, '&quot;').replace(/'/g, '&#x27;');
+  }
+
+  // Same highlighting as pformat_sql_html()
+  function formatSql(sql, lineBreaks) {
+    var html = escapeHtml(sql);
+    if (lineBreaks) {
+      html = html.replace(RE_SQL_NL, '<br>$1');
+    }
+    return html.replace(RE_SQL, '<strong>$1</strong>');
+  }
+
+
+  /**
+   * A scrolling list which only renders the visible rows.
+   */
+  function VirtualList(container, renderRow, onClick) {
+    var self = this;
+    this.rows = [];
+    this.renderRow = renderRow;
+    this.viewport = document.createElement('div');
+    this.viewport.className = 'dt-virtual';
+    this.content = document.createElement('div');
+    this.content.className = 'dt-rows';
+    this.viewport.appendChild(this.content);
+    container.appendChild(this.viewport);
+
+    var pending = false;
+    this.viewport.onscroll = function() {
+      if (!pending) {
+        pending = true;
+        (window.requestAnimationFrame || window.setTimeout)(function() { pending = false; self.render(); });
+      }
+    };
+    this.content.onclick = function(event) {
+      var target = event.target;
+      while (target && target !== self.content && !target.getAttribute('data-index')) {
+        target = target.parentNode;
+      }
+      if (target && target !== self.content) {
+        onClick(self.rows[parseInt(target.getAttribute('data-index'), 10)], event);
+      }
+    };
+  }
+
+  VirtualList.prototype.setRows = function(rows) {
+    this.rows = rows;
+    this.content.style.height = (rows.length * ROW_HEIGHT) + 'px';
+    this.viewport.style.height = Math.min(rows.length * ROW_HEIGHT, MAX_HEIGHT) + 'px';
+    this.render();
+  };
+
+  VirtualList.prototype.render = function() {
+    var top = this.viewport.scrollTop;
+    var height = this.viewport.clientHeight || MAX_HEIGHT;
+    var start = Math.max(0, Math.floor(top / ROW_HEIGHT) - OVERSCAN);
+    var end = Math.min(this.rows.length, Math.ceil((top + height) / ROW_HEIGHT) + OVERSCAN);
+    var html = [];
+    for (var i = start; i < end; i++) {
+      html.push('<div class="dt-row" data-index="' + i + '" style="top: ' + (i * ROW_HEIGHT) + 'px;">' + this.renderRow(this.rows[i], i) + '</div>');
+    }
+    this.content.innerHTML = html.join('');
+  };
+
+
+  /**
+   * The tree is a list of [label, items, is_open] context scopes,
+   * each item is a [key, type, text] list. Multi-line text can be expanded.
+   */
+  function buildTree(data) {
+    var nodes = [];
+    for (var i = 0; i < data.length; i++) {
+      var items = [];
+      for (var j = 0; j < data[i][1].length; j++) {
+        items.push(buildItem(data[i][1][j]));
+      }
+      nodes.push({html: escapeHtml(data[i][0]), text: '', depth: 0, children: items, open: !!data[i][2]});
+    }
+    return nodes;
+  }
+
+  function buildItem(item) {
+    var key = item[0], type = item[1], text = item[2];
+    var lines = text.split('\n');
+    var children = null;
+    if (lines.length > 1) {
+      children = [];
+      for (var i = 1; i < lines.length; i++) {
+        children.push({html: escapeHtml(lines[i]), text: lines[i].toLowerCase(), detail: lines[i], depth: 2, children: null});
+      }
+    }
+    return {
+      html: '<strong title="' + escapeHtml(type) + '">' + escapeHtml(key) + '</strong>: ' + escapeHtml(lines[0]),
+      text: (key + ': ' + lines[0]).toLowerCase(),
+      detail: key + ': ' + text,
+      depth: 1,
+      children: children,
+      open: lines.length <= 20
+    };
+  }
+
+  function flattenTree(nodes, query, out) {
+    var found = false;
+    for (var i = 0; i < nodes.length; i++) {
+      var node = nodes[i];
+      var start = out.length;
+      out.push(node);
+      if (!query) {
+        found = true;
+        if (node.children && node.open) {
+          flattenTree(node.children, query, out);
+        }
+      }
+      else {
+        // Only keep the matching rows, and the parents which lead to them.
+        var childFound = node.children ? flattenTree(node.children, query, out) : false;
+        if (childFound || node.text.indexOf(query) !== -1) {
+          found = true;
+        }
+        else {
+          out.length = start;
+        }
+      }
+    }
+    return found;
+  }
+
+  function renderTree(container, data) {
+    var nodes = buildTree(data);
+    var query = '';
+    var detail = document.createElement('div');
+    detail.className = 'dt-detail';
+    var list = new VirtualList(container, function(node) {
+      var toggle = node.children ? (query ? '&#9662;' : (node.open ? '&#9662;' : '&#9656;')) : '';
+      return '<span style="padding-left: ' + (node.depth * 14) + 'px;"><a class="dt-toggle">' + toggle + '</a>' + node.html + '</span>';
+    }, function(node) {
+      // Long lines are cut off, so the full text is displayed below the list.
+      if (node.detail) {
+        detail.textContent = node.detail;
+      }
+      if (node.children && !query) {
+        node.open = !node.open;
+        refresh();
+      }
+    });
+    container.appendChild(detail);
+
+    function refresh() {
+      var rows = [];
+      flattenTree(nodes, query, rows);
+      list.setRows(rows);
+    }
+
+    addSearch(container, function(value) { query = value; refresh(); });
+    refresh();
+  }
+
+
+  /**
+   * Queries are [time, sql] lists.
+   */
+  function renderQueries(container, data) {
+    var queries = [];
+    for (var i = 0; i < data.length; i++) {
+      queries.push({num: i + 1, time: data[i][0], sql: data[i][1], text: data[i][1].toLowerCase()});
+    }
+
+    var detail = document.createElement('div');
+    detail.className = 'dt-detail';
+    var list = new VirtualList(container, function(query) {
+      var sql = formatSql(query.sql, false);
+      return '<span style="display: inline-block; width: 35px; text-align: right;">' + query.num + '</span>  ' +
+             '<span style="display: inline-block; width: 50px;">' + escapeHtml(query.time) + '</span>  ' + sql;
+    }, function(query) {
+      detail.innerHTML = '<strong>#' + query.num + '</strong> (' + escapeHtml(query.time) + ')<br>' + formatSql(query.sql, true);
+    });
+    container.appendChild(detail);
+
+    addSearch(container, function(value) {
+      if (!value) {
+        list.setRows(queries);
+        return;
+      }
+      var rows = [];
+      for (var i = 0; i < queries.length; i++) {
+        if (queries[i].text.indexOf(value) !== -1) {
+          rows.push(queries[i]);
+        }
+      }
+      list.setRows(rows);
+    });
+    list.setRows(queries);
+  }
+
+
+  function addSearch(container, onChange) {
+    var input = document.createElement('input');
+    input.type = 'search';
+    input.className = 'dt-search';
+    input.placeholder = 'Filter...';
+    var timer = null;
+    input.oninput = function() {
+      window.clearTimeout(timer);
+      timer = window.setTimeout(function() { onChange(input.value.toLowerCase()); }, 150);
+    };
+    container.insertBefore(input, container.firstChild);
+  }
+
+  function renderAll() {
+    var elements = document.querySelectorAll('[data-debugtools-payload]');
+    for (var i = 0; i < elements.length; i++) {
+      var container = elements[i];
+      if (container.getAttribute('data-debugtools-rendered')) {
+        continue;
+      }
+
+      var payload = document.getElementById(container.getAttribute('data-debugtools-payload'));
+      var data = JSON.parse(payload.textContent);
+      container.setAttribute('data-debugtools-rendered', '1');
+      container.innerHTML = '';
+      if (container.getAttribute('data-debugtools-kind') === 'queries') {
+        renderQueries(container, data);
+      }
+      else {
+        renderTree(container, data);
+      }
+    }
+  }
+
+  var style = document.createElement('style');
+  style.appendChild(document.createTextNode(STYLE));
+  (document.head || document.documentElement).appendChild(style);
+
+  if (document.readyState === 'loading') {
+    document.addEventListener('DOMContentLoaded', renderAll);
+  }
+  else {
+    renderAll();
+  }
+
+  window.DebugTools = {renderAll: renderAll};
+})(window, document);
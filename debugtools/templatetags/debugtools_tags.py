@@ -1,18 +1,29 @@
 """
 Debugging features in in the template.
 """
+import hashlib
+import itertools
 import sys
+import threading
+from collections import OrderedDict
 
-from django.template import Library, Node, Variable, VariableDoesNotExist
-from django.template.defaultfilters import linebreaksbr
+from django.conf import settings
+from django.template import Library, Node, TemplateSyntaxError, Variable, VariableDoesNotExist
+from django.template.defaultfilters import filesizeformat, linebreaksbr
+from django.templatetags.static import static
 from django.utils.functional import Promise
-from django.utils.html import escape, mark_safe
+from django.utils.html import escape, json_script, mark_safe
 
 from debugtools.formatter import (
+    pformat_dict_items,
+    pformat_dict_items_html,
     pformat_dict_summary_html,
     pformat_django_context_html,
     pformat_sql_html,
 )
+from debugtools.utils.memory import get_context_sizes
+from debugtools.utils.queries import group_queries
+from debugtools.utils.suggestions import KeyIndex
 
 try:
     from django.template import context_processors  # Django 1.8+
@@ -26,28 +37,73 @@ else:
 
 SHORT_NAME_TYPES = (bool, int, float, Promise, string_types)
 
-DEBUG_WRAPPER_BLOCK = '<div class="django-debugtools-output" style="z-index: 10001; position: relative; clear: both;">{0}</div>'
+DEBUG_WRAPPER_START = '<div class="django-debugtools-output">'
+
+DEBUG_WRAPPER_END = "</div>"
 
 # Twitter Bootstrap <pre> style:
 PRE_STYLE = """clear: both; font-family: Menlo,Monaco,"Courier new",monospace; color: #333; background-color: #f5f5f5; border: 1px solid rgba(0, 0, 0, 0.15); border-radius: 4px 4px 4px 4px; font-size: 12.025px; text-align: left; line-height: 18px; margin: 9px; padding: 8px;"""
 
 PRE_ALERT_STYLE = """clear: both; font-family: Menlo,Monaco,"Courier new",monospace; color: #C09853; background-color: #FCF8E3; border: 1px solid #FBEED5; border-radius: 4px 4px 4px 4px; font-size: 12.025px; text-align: left; line-height: 18px; margin-bottom: 18px; padding: 8px 35px 8px 14px; text-shadow: 0 1px 0 rgba(255, 255, 255, 0.5); white-space: pre-wrap; word-break: normal; word-wrap: normal;"""  # different word-wrap then Twitter Bootstrap
 
-CONTEXT_TITLE = (
-    '<h6 style="color: #999999; font-size: 11px; margin: 9px 0;">TEMPLATE CONTEXT SCOPE:</h6>\n'
-)
+# The styles are written once per template, the dumps only reference the class names.
+STYLESHEET = (
+    '<style type="text/css">'
+    ".django-debugtools-output {{ z-index: 10001; position: relative; clear: both; }}"
+    ".django-debugtools-pre {{ {pre_style} }}"
+    ".django-debugtools-pre strong {{ color: #222; }}"
+    ".django-debugtools-alert {{ {pre_alert_style} }}"
+    ".django-debugtools-context {{ position: relative; }}"
+    ".django-debugtools-num {{ position: absolute; top: 9px; left: 5px; background-color: #f5f5f5; }}"
+    ".django-debugtools-title {{ color: #999999; font-size: 11px; margin: 9px 0; }}"
+    "</style>"
+).format(pre_style=PRE_STYLE, pre_alert_style=PRE_ALERT_STYLE)
+
+CONTEXT_TITLE = '<h6 class="django-debugtools-title">TEMPLATE CONTEXT SCOPE:</h6>\n'
+
+CONTEXT_DIFF_TITLE = '<h6 class="django-debugtools-title">TEMPLATE CONTEXT SCOPE CHANGES:</h6>\n'
+
+CONTEXT_SIZES_TITLE = '<h6 class="django-debugtools-title">TEMPLATE CONTEXT SIZES:</h6>\n'
+
+CONTEXT_SIZES_BLOCK = "<pre class='django-debugtools-pre'>{sizes}</pre>"
+
+CONTEXT_SIZE_ROW = "{size:>12}  <strong>{key}</strong> <small>{type}</small>"
+
+CONTEXT_UNCHANGED_NOTE = "<small>(unchanged since a previous request: {keys})</small>"
 
 CONTEXT_BLOCK = (
-    "<pre style='{style}; position: relative;'>"
-    "<small style='position:absolute; top: 9px; left: 5px; background-color: #f5f5f5;'><a href='#' onclick='var s1=this.parentNode.nextSibling, s2=s1.nextSibling, d1=s1.style.display, d2=s2.style.display; s1.style.display=d2; s2.style.display=d1; return false'>{num}:</a></small>"
+    "<pre class='django-debugtools-pre django-debugtools-context'>"
+    "<small class='django-debugtools-num'><a href='#' onclick='var s1=this.parentNode.nextSibling, s2=s1.nextSibling, d1=s1.style.display, d2=s2.style.display; s1.style.display=d2; s2.style.display=d1; return false'>{num}:</a></small>"
     "<span>{dump1}</span><span style='display:none'>{dump2}</span></pre>"
 )
 
-BASIC_TYPE_BLOCK = "<pre style='{style}'>{name} = {value}</pre>"
+BASIC_TYPE_BLOCK = "<pre class='django-debugtools-pre'>{name} = {value}</pre>"
 
-ERROR_TYPE_BLOCK = "<pre style='{style}'>{error}</pre>"
+ERROR_TYPE_BLOCK = "<pre class='django-debugtools-alert'>{error}</pre>"
+
+OBJECT_TYPE_BLOCK = (
+    "<pre class='django-debugtools-pre'>{name} = <small>{type}</small>:\n{value}</pre>"
+)
 
-OBJECT_TYPE_BLOCK = "<pre style='{style}'>{name} = <small>{type}</small>:\n{value}</pre>"
+# Large output is rendered by jquery.debug.js, which only adds the visible rows to the DOM.
+CLIENT_RENDER_BLOCK = "<div class='django-debugtools-pre' data-debugtools-payload='{id}' data-debugtools-kind='{kind}'><small>(rendering {count} rows...)</small></div>"
+
+CLIENT_SCRIPT_TAG = "<script src='{src}'></script>"
+
+# The default for settings.DEBUGTOOLS_CLIENT_RENDER_ROWS
+CLIENT_RENDER_ROWS = 500
+
+CONTEXT_OPTIONS = ("diff", "sizes")
+
+PRINT_OPTIONS = ("full",)
+
+# Maximum number of fingerprints to remember for collapsing unchanged context variables.
+MAX_FINGERPRINTS = 1000
+
+_fingerprints = OrderedDict()
+_fingerprints_lock = threading.Lock()
+
+_payload_ids = itertools.count(1)
 
 
 register = Library()
@@ -57,41 +113,161 @@ class PrintNode(Node):
     @classmethod
     def parse(cls, parser, token):
         varnames = token.contents.split()[1:]
-        return cls(variables=[(name, parser.compile_filter(name)) for name in varnames])
+        options = []
+        # Options follow the variables, e.g. {% print object full %}
+        while len(varnames) > 1 and varnames[-1] in PRINT_OPTIONS:
+            options.append(varnames.pop())
+        return cls(
+            variables=[(name, parser.compile_filter(name)) for name in varnames], options=options
+        )
 
-    def __init__(self, variables):
+    @classmethod
+    def parse_context(cls, parser, token):
+        bits = token.split_contents()
+        for option in bits[1:]:
+            if option not in CONTEXT_OPTIONS:
+                raise TemplateSyntaxError(
+                    "{} received unknown option '{}', choices are: {}".format(
+                        bits[0], option, ", ".join(CONTEXT_OPTIONS)
+                    )
+                )
+        return cls(variables=(), options=bits[1:])
+
+    def __init__(self, variables, options=()):
         # Thread safety OK: the list of varnames won't change for this node.
         # Data is read only inside the render() function.
         self.variables = list(variables)
+        self.options = frozenset(options)
 
     def render(self, context):
+        # All output is appended to a single buffer.
+        text = []
+        _add_stylesheet(context, text)
+        text.append(DEBUG_WRAPPER_START)
         if self.variables:
-            text = self.print_variables(context)
+            self.print_variables(context, text)
+        elif "sizes" in self.options:
+            self.print_context_sizes(context, text)
+        elif "diff" in self.options:
+            self.print_context_diff(context, text)
         else:
-            text = self.print_context(context)
-        return mark_safe(DEBUG_WRAPPER_BLOCK.format(text))
+            self.print_context(context, text)
+        text.append(DEBUG_WRAPPER_END)
+        return mark_safe("".join(text))
 
-    def print_context(self, context):
+    def print_context(self, context, text):
         """
         Print the entire template context
         """
-        text = [CONTEXT_TITLE]
+        scopes = []
+        num_rows = 0
         for i, context_scope in enumerate(context):
-            dump1 = linebreaksbr(pformat_django_context_html(context_scope))
+            items = pformat_dict_items(context_scope)
+            num_lines = sum(value_text.count("\n") for key, value, key_text, value_text in items)
+            num_rows += num_lines + max(len(items), 1)
+            scopes.append((i, context_scope, items, num_lines))
+
+        max_rows = _get_client_render_rows()
+        if max_rows and num_rows > max_rows:
+            # The text is sent as-is, jquery.debug.js generates the HTML.
+            tree = [
+                [
+                    f"{i}:",
+                    [
+                        [key_text, type(value).__name__, value_text]
+                        for key, value, key_text, value_text in items
+                    ],
+                    int(not _is_collapsed(context_scope, num_lines)),
+                ]
+                for i, context_scope, items, num_lines in scopes
+            ]
+            text.append(CONTEXT_TITLE)
+            _render_client_side(context, text, "tree", tree, num_rows)
+            return
+
+        text.append(CONTEXT_TITLE)
+        for i, context_scope, items, num_lines in scopes:
+            dump1 = linebreaksbr(pformat_dict_items_html(items))
             dump2 = pformat_dict_summary_html(context_scope)
 
             # Collapse long objects by default (e.g. request, LANGUAGES and sql_queries)
-            if len(context_scope) <= 3 and dump1.count("<br />") > 20:
+            if _is_collapsed(context_scope, num_lines):
                 (dump1, dump2) = (dump2, dump1)
 
-            text.append(CONTEXT_BLOCK.format(style=PRE_STYLE, num=i, dump1=dump1, dump2=dump2))
-        return "".join(text)
+            text.append(CONTEXT_BLOCK.format(num=i, dump1=dump1, dump2=dump2))
 
-    def print_variables(self, context):
+    def print_context_diff(self, context, text):
         """
-        Print a set of variables
+        Print only the variables each context scope adds or overrides.
+        The variables of the context processors are collapsed when they didn't change
+        since a previous request, so the output focuses on the data provided by the view.
         """
+        processors_index = getattr(context, "_processors_index", None)
+        blocks = []
+        below = {}
+        for level, context_scope in enumerate(context.dicts):
+            changes = {
+                key: value
+                for key, value in context_scope.items()
+                if key not in below or below[key] is not value
+            }
+            below.update(context_scope)
+            if not changes:
+                continue
+
+            num = len(context.dicts) - level - 1
+            if level == 0 or level == processors_index:
+                dump1 = self._format_fingerprinted_scope(context, changes)
+            else:
+                dump1 = linebreaksbr(pformat_django_context_html(changes))
+            dump2 = pformat_dict_summary_html(changes)
+            blocks.append(CONTEXT_BLOCK.format(num=num, dump1=dump1, dump2=dump2))
+
+        # Display the top-most scope first, like print_context() does.
+        text.append(CONTEXT_DIFF_TITLE)
+        text.extend(reversed(blocks))
+
+    def _format_fingerprinted_scope(self, context, context_scope):
         text = []
+        unchanged = []
+        for key, value in context_scope.items():
+            dump = pformat_django_context_html({key: value})
+            if _is_known_fingerprint(context, key, dump):
+                unchanged.append(str(key))
+            else:
+                text.append(linebreaksbr(dump))
+
+        if unchanged:
+            text.append(CONTEXT_UNCHANGED_NOTE.format(keys=escape(", ".join(unchanged))))
+        return mark_safe("<br/>".join(text))
+
+    def print_context_sizes(self, context, text):
+        """
+        Print the approximate memory size of each context variable, largest first.
+        """
+        # Only measure the values the template can see, the top-most scope wins.
+        variables = {}
+        for context_scope in context:
+            for key, value in context_scope.items():
+                variables.setdefault(key, value)
+
+        rows = []
+        for item in get_context_sizes(variables):
+            size = filesizeformat(item["size"])
+            rows.append(
+                CONTEXT_SIZE_ROW.format(
+                    size=size if item["complete"] else f">{size}",
+                    key=escape(item["key"]),
+                    type=escape(item["type"]),
+                )
+            )
+        text.append(CONTEXT_SIZES_TITLE)
+        text.append(CONTEXT_SIZES_BLOCK.format(sizes="\n".join(rows)))
+
+    def print_variables(self, context, text):
+        """
+        Print a set of variables
+        """
         for name, expr in self.variables:
             # Some extended resolving, to handle unknown variables
             data = ""
@@ -101,36 +277,54 @@ class PrintNode(Node):
                 else:
                     data = expr.resolve(context)  # could return TEMPLATE_STRING_IF_INVALID
             except VariableDoesNotExist as e:
-                # Failed to resolve, display exception inline
-                keys = []
-                for scope in context:
-                    keys += scope.keys()
-                keys = sorted(set(keys))  # Remove duplicates, e.g. csrf_token
-                return ERROR_TYPE_BLOCK.format(
-                    style=PRE_ALERT_STYLE,
-                    error=escape(
-                        "Variable '{}' not found!  Available context variables are:\n\n{}".format(
-                            expr, ", ".join(keys)
-                        )
-                    ),
+                # Failed to resolve, display exception inline, and continue with the next variable.
+                text.append(
+                    ERROR_TYPE_BLOCK.format(error=escape(_format_not_found(context, expr)))
                 )
+                continue
             else:
                 # Regular format
-                textdata = linebreaksbr(pformat_django_context_html(data))
+                full = "full" in self.options
+                max_rows = _get_client_render_rows()
+                if max_rows and _is_client_renderable(data) and len(data) > max_rows:
+                    # Each item takes at least one row, no need to generate the HTML first.
+                    self._print_variable_client_side(context, text, name, data, len(data), full)
+                    continue
+
+                textdata = linebreaksbr(pformat_django_context_html(data, full=full))
+                num_rows = textdata.count("<br")  # linebreaksbr() also converted the newlines.
+                if max_rows and _is_client_renderable(data) and num_rows > max_rows:
+                    self._print_variable_client_side(context, text, name, data, num_rows, full)
+                    continue
 
             # At top level, prefix class name if it's a longer result
             if isinstance(data, SHORT_NAME_TYPES):
-                text.append(BASIC_TYPE_BLOCK.format(style=PRE_STYLE, name=name, value=textdata))
+                text.append(BASIC_TYPE_BLOCK.format(name=name, value=textdata))
             else:
                 text.append(
                     OBJECT_TYPE_BLOCK.format(
-                        style=PRE_STYLE,
                         name=name,
                         type=data.__class__.__name__,
                         value=textdata,
                     )
                 )
-        return "".join(text)
+
+    def _print_variable_client_side(self, context, text, name, data, num_rows, full=False):
+        # Lists are displayed by index, so each item can be expanded like a dictionary key.
+        items = pformat_dict_items(
+            data if isinstance(data, dict) else dict(enumerate(data)), full=full
+        )
+        tree = [
+            [
+                f"{name} = {type(data).__name__}:",
+                [
+                    [key_text, type(value).__name__, value_text]
+                    for key, value, key_text, value_text in items
+                ],
+                1,
+            ]
+        ]
+        _render_client_side(context, text, "tree", tree, num_rows)
 
 
 @register.tag("print")
@@ -141,9 +335,40 @@ def _print(parser, token):
     return PrintNode.parse(parser, token)
 
 
+@register.tag("print_context")
+def _print_context(parser, token):
+    """
+    A template tag which dumps the template context.
+    With the ``diff`` option, only the changes of each context scope are displayed.
+    With the ``sizes`` option, the memory size of each context variable is displayed.
+    """
+    return PrintNode.parse_context(parser, token)
+
+
 @register.inclusion_tag("debugtools/sql_queries.html", takes_context=True)
 def print_queries(context):
-    return context_processors.debug(context["request"])
+    data = context_processors.debug(context["request"])
+    if "sql_queries" not in data:
+        return data
+
+    # Django provides a lazy() function, which the template would call.
+    sql_queries = data["sql_queries"]
+    data["sql_queries"] = sql_queries = list(
+        sql_queries() if callable(sql_queries) else sql_queries
+    )
+    max_rows = _get_client_render_rows()
+    if max_rows and len(sql_queries) > max_rows:
+        rows = [[query["time"], query["sql"]] for query in sql_queries]
+        text = []
+        _add_stylesheet(context, text)
+        _render_client_side(context, text, "queries", rows, len(rows))
+        data["client_side"] = mark_safe("".join(text))
+
+    # The QueryAttributionMiddleware tracks which template line caused each query.
+    recorder = getattr(context["request"], "_query_recorder", None)
+    if recorder is not None:
+        data["query_locations"] = group_queries(recorder.queries)
+    return data
 
 
 @register.filter
@@ -151,5 +376,108 @@ def format_sql(sql):
     return mark_safe(pformat_sql_html(sql))
 
 
+def _format_not_found(context, expr):
+    index = _get_key_index(context)
+    message = f"Variable '{expr}' not found!"
+
+    # Only suggest context variables when the first part of the variable was not found.
+    var = expr.var
+    name = var.lookups[0] if isinstance(var, Variable) and var.lookups else None
+    if name and not any(name in scope for scope in context):
+        suggestions = index.suggest(name)
+        if suggestions:
+            message += "  Did you mean: {}?".format(", ".join(suggestions))
+
+    return "{}\n\nAvailable context variables are:\n\n{}".format(message, ", ".join(index.keys))
+
+
+def _get_key_index(context):
+    """
+    Get the index of context variable names.
+    The index is shared between all {% print %} tags in the same template,
+    and only rebuilt when the context changed.
+    """
+    # The scopes are kept, so their id() can't be reused by a new scope while the index is cached.
+    scopes = [(scope, len(scope)) for scope in context.dicts]
+    try:
+        index_scopes, index = context.render_context["debugtools_key_index"]
+    except KeyError:
+        pass
+    else:
+        if len(index_scopes) == len(scopes) and all(
+            scope is index_scope and size == index_size
+            for (scope, size), (index_scope, index_size) in zip(scopes, index_scopes)
+        ):
+            return index
+
+    index = KeyIndex(key for scope in context.dicts for key in scope)
+    context.render_context["debugtools_key_index"] = (scopes, index)
+    return index
+
+
+def _get_client_render_rows():
+    # Set DEBUGTOOLS_CLIENT_RENDER_ROWS = None to always render the output as HTML.
+    return getattr(settings, "DEBUGTOOLS_CLIENT_RENDER_ROWS", CLIENT_RENDER_ROWS)
+
+
+def _is_client_renderable(data):
+    # Only lists and dictionaries can be split into rows.
+    return isinstance(data, (dict, list, tuple))
+
+
+def _is_collapsed(context_scope, num_lines):
+    return len(context_scope) <= 3 and num_lines > 20
+
+
+def _add_stylesheet(context, text):
+    """
+    Add the stylesheet once per template.
+    """
+    if "debugtools_stylesheet" not in context.render_context:
+        context.render_context["debugtools_stylesheet"] = True
+        text.append(STYLESHEET)
+
+
+def _render_client_side(context, text, kind, payload, num_rows):
+    """
+    Embed the data as JSON, which jquery.debug.js renders.
+    The script tag is only added once per template.
+    """
+    element_id = f"debugtools-payload-{next(_payload_ids)}"
+    text.append(CLIENT_RENDER_BLOCK.format(id=element_id, kind=kind, count=num_rows))
+    text.append(json_script(payload, element_id))
+    if "debugtools_script" not in context.render_context:
+        context.render_context["debugtools_script"] = True
+        text.append(CLIENT_SCRIPT_TAG.format(src=escape(static("debugtools/jquery.debug.js"))))
+
+
+def _is_known_fingerprint(context, key, dump):
+    """
+    Tell whether the same output was generated by a previous request.
+    """
+    fingerprint = (key, hashlib.sha1(dump.encode("utf-8")).hexdigest())
+
+    # Remember the answer for this template,
+    # so another {% print_context diff %} doesn't see the fingerprints it just added.
+    answers = context.render_context.setdefault("debugtools_fingerprints", {})
+    try:
+        return answers[fingerprint]
+    except KeyError:
+        pass
+
+    with _fingerprints_lock:
+        if fingerprint in _fingerprints:
+            _fingerprints.move_to_end(fingerprint)
+            known = True
+        else:
+            _fingerprints[fingerprint] = True
+            if len(_fingerprints) > MAX_FINGERPRINTS:
+                _fingerprints.popitem(last=False)
+            known = False
+
+    answers[fingerprint] = known
+    return known
+
+
 def _format_exception(exception):
     return '<span style="color: #B94A48;">{}</span>'.format(escape(f"<{exception}>"))
@@ -0,0 +1,107 @@
+"""
+INTERNAL FUNCTIONS FOR {% print_context sizes %} and ViewPanel
+
+Estimates the memory that is retained by template context objects.
+"""
+import sys
+import types
+from collections import deque
+from itertools import islice
+
+from django.utils.functional import LazyObject, empty
+
+# Maximum number of objects to visit per measured value.
+MAX_NODES = 20000
+
+# These objects are shared by the whole process, they don't belong to a single value.
+SKIPPED_TYPES = (
+    type,
+    types.ModuleType,
+    types.FunctionType,
+    types.BuiltinFunctionType,
+    types.MethodType,
+    types.CodeType,
+    types.FrameType,
+)
+
+# Only iterate over types which can be traversed without side effects (e.g. consuming a generator).
+SEQUENCE_TYPES = (list, tuple, set, frozenset, deque)
+
+
+def get_deep_size(obj, max_nodes=MAX_NODES):
+    """
+    Estimate the size of an object, including the objects it references.
+    This returns a tuple of "size in bytes, is complete".
+    When more than ``max_nodes`` objects are found, the walk stops and the size is a lower bound.
+    """
+    seen = set()
+    stack = [obj]
+    size = 0
+    while stack:
+        if len(seen) >= max_nodes:
+            return size, False
+
+        obj = stack.pop()
+        # Using type() instead of isinstance(), as that would read __class__ from lazy objects.
+        cls = type(obj)
+        if id(obj) in seen or issubclass(cls, SKIPPED_TYPES):
+            continue
+        seen.add(id(obj))
+
+        try:
+            size += sys.getsizeof(obj)
+        except TypeError:
+            continue
+
+        if issubclass(cls, (str, bytes, bytearray, int, float)):
+            continue
+        elif issubclass(cls, LazyObject):
+            # Avoid evaluating request.user or the session.
+            wrapped = obj._wrapped
+            if wrapped is not empty:
+                stack.append(wrapped)
+            continue
+        elif issubclass(cls, dict):
+            # Access the raw values, e.g. the lists of a QueryDict.
+            for key, value in islice(dict.items(obj), max_nodes):
+                stack.append(key)
+                stack.append(value)
+        elif issubclass(cls, SEQUENCE_TYPES):
+            stack.extend(islice(obj, max_nodes))
+
+        stack.extend(_get_attributes(obj, cls))
+
+    return size, True
+
+
+def get_context_sizes(context_data, max_nodes=MAX_NODES):
+    """
+    Measure each key of a context, the largest objects are returned first.
+    """
+    sizes = []
+    for key, value in context_data.items():
+        size, complete = get_deep_size(value, max_nodes=max_nodes)
+        sizes.append(
+            {"key": key, "type": type(value).__name__, "size": size, "complete": complete}
+        )
+
+    sizes.sort(key=lambda item: item["size"], reverse=True)
+    return sizes
+
+
+def _get_attributes(obj, cls):
+    try:
+        attrs = list(object.__getattribute__(obj, "__dict__").values())
+    except (AttributeError, TypeError):
+        attrs = []
+
+    for base in cls.__mro__:
+        slots = base.__dict__.get("__slots__", ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            try:
+                attrs.append(object.__getattribute__(obj, name))
+            except (AttributeError, TypeError):
+                pass
+    return attrs
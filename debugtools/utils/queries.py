@@ -0,0 +1,103 @@
+"""
+INTERNAL FUNCTIONS FOR QueryAttributionMiddleware and {% print_queries %}
+
+Tracks which template line caused each query.
+"""
+import sys
+from time import perf_counter
+
+from django.template.base import Node, TokenType
+
+# Maximum number of queries to record per request.
+MAX_QUERIES = 10000
+
+# Maximum number of stack frames to inspect for the template node.
+MAX_FRAMES = 300
+
+_RENDER_ANNOTATED_CODE = Node.render_annotated.__code__
+
+
+class QueryRecorder:
+    """
+    A ``connection.execute_wrapper()`` which tags each query with the template node being rendered.
+    """
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < MAX_QUERIES:
+                template, lineno, expression = get_template_location()
+                self.queries.append(
+                    {
+                        "sql": sql,
+                        "time": perf_counter() - start,
+                        "template": template,
+                        "lineno": lineno,
+                        "expression": expression,
+                    }
+                )
+
+
+def get_template_location():
+    """
+    Find the template node which is currently rendered.
+    This returns a tuple of "template name, line number, expression",
+    or ``(None, None, None)`` when the query didn't happen in a template.
+    """
+    frame = sys._getframe(1)
+    for _ in range(MAX_FRAMES):
+        if frame is None:
+            break
+        if frame.f_code is _RENDER_ANNOTATED_CODE:
+            node = frame.f_locals.get("self")
+            token = getattr(node, "token", None)
+            origin = getattr(node, "origin", None)
+            if token is not None and origin is not None:
+                return (
+                    origin.template_name or origin.name,
+                    token.lineno,
+                    _format_token(token),
+                )
+        frame = frame.f_back
+
+    return None, None, None
+
+
+def group_queries(queries):
+    """
+    Group the recorded queries by the template location that caused them.
+    The locations with the most queries are returned first.
+    """
+    groups = {}
+    for query in queries:
+        key = (query["template"], query["lineno"], query["expression"])
+        try:
+            group = groups[key]
+        except KeyError:
+            group = groups[key] = {
+                "template": query["template"],
+                "lineno": query["lineno"],
+                "expression": query["expression"],
+                "count": 0,
+                "time": 0.0,
+                "sql": query["sql"],
+            }
+
+        group["count"] += 1
+        group["time"] += query["time"]
+
+    return sorted(groups.values(), key=lambda group: (group["count"], group["time"]), reverse=True)
+
+
+def _format_token(token):
+    if token.token_type == TokenType.VAR:
+        return f"{{{{ {token.contents} }}}}"
+    elif token.token_type == TokenType.BLOCK:
+        return f"{{% {token.contents} %}}"
+    else:
+        return token.contents
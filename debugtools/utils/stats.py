@@ -0,0 +1,114 @@
+"""
+INTERNAL FUNCTIONS FOR ViewPanel
+
+Aggregates timing and query statistics across requests.
+The data is kept in memory, bounded in size and protected by a lock,
+so it can be shared by the threads of a runserver or gunicorn worker.
+"""
+import math
+import threading
+from collections import OrderedDict, deque
+
+# Maximum number of distinct views/templates to remember.
+MAX_ENTRIES = 200
+
+# Number of recent timings per entry used to calculate the mean and p95.
+MAX_SAMPLES = 500
+
+
+class RequestStatistics:
+    """
+    Statistics for a single view or template.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.queries = 0
+        self.query_hits = 0
+        self.timings = deque(maxlen=MAX_SAMPLES)
+        self.template_choices = {}
+
+    def add(self, duration, num_queries, template=None):
+        self.hits += 1
+        if num_queries is not None:
+            # The queries are not counted when DEBUG = False.
+            self.queries += num_queries
+            self.query_hits += 1
+        if duration is not None:
+            self.timings.append(duration)
+        if template:
+            self.template_choices[template] = self.template_choices.get(template, 0) + 1
+
+    def as_dict(self, name):
+        timings = sorted(self.timings)
+        return {
+            "name": name,
+            "hits": self.hits,
+            "mean": (sum(timings) / len(timings)) if timings else None,
+            "p95": _percentile(timings, 95) if timings else None,
+            "queries": self.queries if self.query_hits else None,
+            "mean_queries": (self.queries / self.query_hits) if self.query_hits else None,
+            "template_choices": sorted(
+                self.template_choices.items(), key=lambda item: item[1], reverse=True
+            ),
+        }
+
+
+class StatisticsRegistry:
+    """
+    A bounded registry of :class:`RequestStatistics`, indexed by view and template name.
+    When the limit is reached, the least recently used entry is dropped.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._views = OrderedDict()
+        self._templates = OrderedDict()
+
+    def add(self, view_name, template, duration, num_queries, template_choices=None):
+        # Only the choice that was taken is tracked, not all possible candidates.
+        chosen = template if template_choices else None
+        with self._lock:
+            if view_name:
+                self._get(self._views, view_name).add(duration, num_queries, chosen)
+            if template:
+                self._get(self._templates, template).add(duration, num_queries)
+
+    def _get(self, entries, key):
+        try:
+            entries.move_to_end(key)
+            return entries[key]
+        except KeyError:
+            stats = entries[key] = RequestStatistics()
+            if len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            return stats
+
+    def get_view_stats(self):
+        with self._lock:
+            return _snapshot(self._views)
+
+    def get_template_stats(self):
+        with self._lock:
+            return _snapshot(self._templates)
+
+    def clear(self):
+        with self._lock:
+            self._views.clear()
+            self._templates.clear()
+
+
+def _snapshot(entries):
+    # Take a copy, which can be rendered later without holding the lock.
+    result = [stats.as_dict(name) for name, stats in entries.items()]
+    result.sort(key=lambda item: item["hits"], reverse=True)
+    return result
+
+
+def _percentile(sorted_values, percent):
+    index = int(math.ceil(percent / 100.0 * len(sorted_values))) - 1
+    return sorted_values[max(index, 0)]
+
+
+registry = StatisticsRegistry()
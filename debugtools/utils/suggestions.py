@@ -0,0 +1,88 @@
+"""
+INTERNAL FUNCTIONS FOR {% print %}
+
+Suggests similar variable names when a variable can't be found.
+"""
+
+# Marks the end of a word in the trie.
+_END = None
+
+
+class KeyIndex:
+    """
+    A trie of the context variable names, which supports fuzzy lookups by edit distance.
+    """
+
+    def __init__(self, keys):
+        self.keys = sorted({str(key) for key in keys})
+        self._trie = {}
+        for key in self.keys:
+            node = self._trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[_END] = key
+
+    def suggest(self, word, max_distance=None, limit=5):
+        """
+        Find the keys which are closest to the word, by their Levenshtein distance.
+        """
+        if max_distance is None:
+            max_distance = 1 if len(word) <= 3 else 2
+
+        results = []
+        first_row = list(range(len(word) + 1))
+        for char, child in self._trie.items():
+            if char is not _END:
+                self._search(child, char, word, first_row, max_distance, results)
+
+        results.sort()
+        suggestions = [key for distance, key in results[:limit]]
+
+        # Also suggest longer names that start with the word, e.g. "obj" for "object".
+        for key in self._find_prefixed(word):
+            if len(suggestions) >= limit:
+                break
+            if key not in suggestions:
+                suggestions.append(key)
+        return suggestions
+
+    def _find_prefixed(self, prefix):
+        node = self._trie
+        for char in prefix:
+            try:
+                node = node[char]
+            except KeyError:
+                return []
+
+        found = []
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for char, child in node.items():
+                if char is _END:
+                    found.append(child)
+                else:
+                    stack.append(child)
+        return sorted(found, key=len)
+
+    def _search(self, node, char, word, previous_row, max_distance, results):
+        # Calculate one row of the Levenshtein matrix per trie level,
+        # so the rows of a shared prefix are only calculated once.
+        row = [previous_row[0] + 1]
+        for i in range(1, len(word) + 1):
+            row.append(
+                min(
+                    row[i - 1] + 1,
+                    previous_row[i] + 1,
+                    previous_row[i - 1] + (word[i - 1] != char),
+                )
+            )
+
+        if _END in node and row[-1] <= max_distance:
+            results.append((row[-1], node[_END]))
+
+        # Only descend when a match is still possible.
+        if min(row) <= max_distance:
+            for next_char, child in node.items():
+                if next_char is not _END:
+                    self._search(child, next_char, word, row, max_distance, results)
@@ -31,7 +31,7 @@ setup(
     author_email="opensource@edoburu.nl",
     url="https://github.com/edoburu/django-debugtools",
     download_url="https://github.com/edoburu/django-debugtools/zipball/master",
-    packages=find_packages(exclude=("example*",)),
+    packages=find_packages(exclude=("example*", "tests*")),
     include_package_data=True,
     zip_safe=False,
     classifiers=[
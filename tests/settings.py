@@ -0,0 +1,33 @@
+"""
+Minimal settings to run the tests.
+"""
+
+SECRET_KEY = "debugtools-tests"
+
+INSTALLED_APPS = [
+    "django.contrib.auth",
+    "django.contrib.contenttypes",
+    "django.contrib.staticfiles",
+    "debugtools",
+]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": ":memory:",
+    }
+}
+
+TEMPLATES = [
+    {
+        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "APP_DIRS": True,
+        "OPTIONS": {
+            "builtins": ["debugtools.templatetags.debugtools_tags"],
+        },
+    }
+]
+
+STATIC_URL = "/static/"
+
+USE_TZ = True
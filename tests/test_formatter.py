@@ -0,0 +1,120 @@
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
+from django.template import engines
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils.html import escape
+
+from debugtools.formatter import _format_large_value, pformat_django_context_html
+
+
+@override_settings(DEBUGTOOLS_MAX_VALUE_LENGTH=20)
+class FormatLargeValueTests(SimpleTestCase):
+    def test_small(self):
+        self.assertIsNone(_format_large_value("a" * 20))
+        self.assertIsNone(_format_large_value(b"a" * 20))
+
+    def test_str(self):
+        output = repr(_format_large_value("a" * 100 + "b" * 100))
+        self.assertRegex(
+            output,
+            r"^<str of 200 characters, sha1=[0-9a-f]{12}: 'aaaaaaaaaa' \.\.\. 'bbbbbbbbbb'>$",
+        )
+
+    def test_bytes(self):
+        self.assertRegex(
+            repr(_format_large_value(b"\x00" * 100)), r"^<bytes of 100 bytes, sha1=[0-9a-f]{12}: "
+        )
+        self.assertRegex(
+            repr(_format_large_value(memoryview(bytearray(100)))),
+            r"^<memoryview of 100 bytes, sha1=[0-9a-f]{12}: ",
+        )
+
+    def test_digest(self):
+        # The digest is calculated over the whole value, not just the head and tail.
+        self.assertNotEqual(
+            repr(_format_large_value("a" * 50 + "x" + "a" * 50)),
+            repr(_format_large_value("a" * 50 + "y" + "a" * 50)),
+        )
+
+    def test_lone_surrogate(self):
+        output = repr(_format_large_value("a" * 100 + "\udcff"))
+        self.assertRegex(output, r"^<str of 101 characters, sha1=[0-9a-f]{12}: ")
+
+    @override_settings(DEBUGTOOLS_MAX_VALUE_LENGTH=None)
+    def test_unlimited(self):
+        self.assertIsNone(_format_large_value("a" * 100))
+
+    @override_settings(DEBUGTOOLS_MAX_VALUE_LENGTH=1)
+    def test_no_tail(self):
+        self.assertRegex(repr(_format_large_value("ab")), r": '' \.\.\. ''>$")
+        self.assertRegex(repr(_format_large_value(b"ab")), r": b'' \.\.\. b''>$")
+
+    def test_pformat(self):
+        self.assertIn("str of 100 characters", pformat_django_context_html("a" * 100))
+
+    def test_pformat_full(self):
+        self.assertEqual(
+            pformat_django_context_html("a" * 100, full=True), escape(repr("a" * 100))
+        )
+        output = pformat_django_context_html({"value": b"a" * 100}, full=True)
+        self.assertIn(escape(repr(b"a" * 100)), output)
+        self.assertNotIn("bytes of 100 bytes", output)
+
+        # Other dumps are still limited.
+        self.assertIn("str of 100 characters", pformat_django_context_html("a" * 100))
+
+
+class FormatModelTests(TestCase):
+    def test_no_queries(self):
+        # The __str__() of a permission reads the content_type, which isn't loaded.
+        permission = Permission(pk=1, name="Can test", codename="test", content_type_id=1)
+        with self.assertNumQueries(0):
+            output = pformat_django_context_html(permission)
+
+        self.assertIn("<strong>content_type_id</strong>: 1", output)
+        self.assertIn("<strong>content_type</strong>: &lt;not loaded: pk=1&gt;", output)
+        self.assertIn("<strong>__str__</strong>: &lt;not evaluated, performs queries&gt;", output)
+
+        # The database is accessible again.
+        self.assertNotIn("cursor", connection.__dict__)
+        self.assertNotIn("chunked_cursor", connection.__dict__)
+
+    def test_str(self):
+        with self.assertNumQueries(0):
+            output = pformat_django_context_html(Group(name="Editors"))
+        self.assertIn("<strong>__str__</strong>: &#x27;Editors&#x27;", output)
+
+    def test_full(self):
+        group = Group(name="Editors")
+        output = pformat_django_context_html(group)
+        self.assertIn("<strong>natural_key</strong>: &lt;method, not called&gt;", output)
+
+        template = engines["django"].from_string("{% print group full %}")
+        output = template.render({"group": group})
+        self.assertIn("natural_key", output)
+        self.assertIn("(&#x27;Editors&#x27;,)", output)
+
+        # The exception classes of each model are not interesting.
+        self.assertNotIn("DoesNotExist", output)
+        self.assertNotIn("MultipleObjectsReturned", output)
+
+    def test_prefetched(self):
+        # The __str__() of the prefetched permissions would read their content_type.
+        group = Group.objects.create(name="Editors")
+        group.permissions.set(Permission.objects.all()[:2])
+        group = Group.objects.prefetch_related("permissions").get(pk=group.pk)
+
+        with self.assertNumQueries(0):
+            output = pformat_django_context_html(group)
+        self.assertIn("&lt;Permission: &lt;not evaluated, performs queries&gt;&gt;", output)
+
+    def test_select_related(self):
+        permission = Permission.objects.select_related("content_type").first()
+        with self.assertNumQueries(0):
+            output = pformat_django_context_html(permission)
+
+        content_type = permission.content_type
+        self.assertIn(
+            f"<strong>content_type</strong>: &lt;ContentType: {content_type}&gt;", output
+        )
+        self.assertIn(f"<strong>__str__</strong>: &#x27;{permission}&#x27;", output)
@@ -0,0 +1,77 @@
+from django import forms
+from django.forms import formset_factory
+from django.template import engines
+from django.test import SimpleTestCase
+
+from debugtools.formatter import pformat_django_context_html
+
+
+class PersonForm(forms.Form):
+    name = forms.CharField()
+    age = forms.IntegerField(required=False)
+
+
+PersonFormSet = formset_factory(PersonForm, extra=0)
+
+
+class FormatFormTests(SimpleTestCase):
+    def test_not_validated(self):
+        form = PersonForm(data={"name": "", "age": "x"})
+        output = pformat_django_context_html(form)
+
+        # Printing doesn't validate the form, or render the widgets.
+        self.assertIsNone(form._errors)
+        self.assertIn("<strong>errors</strong>: &lt;not validated yet&gt;", output)
+        self.assertIn("&lt;CharField: widget=TextInput, required&gt;", output)
+        self.assertNotIn("<strong>widgets</strong>", output)
+
+    def test_errors(self):
+        form = PersonForm(data={"name": "", "age": "x"})
+        self.assertFalse(form.is_valid())
+        output = pformat_django_context_html(form)
+        self.assertIn("&#x27;name&#x27;: [&#x27;This field is required.&#x27;]", output)
+        self.assertIn("&#x27;age&#x27;: [&#x27;Enter a whole number.&#x27;]", output)
+
+    def test_full(self):
+        form = PersonForm(initial={"name": "John"})
+        output = engines["django"].from_string("{% print form full %}").render({"form": form})
+        self.assertIn("<strong>widgets</strong>", output)
+        self.assertIn(
+            "&lt;input type=&quot;text&quot; name=&quot;name&quot; value=&quot;John&quot;", output
+        )
+
+
+class FormatFormSetTests(SimpleTestCase):
+    def get_formset(self):
+        return PersonFormSet(
+            data={
+                "form-TOTAL_FORMS": "2",
+                "form-INITIAL_FORMS": "0",
+                "form-0-name": "John",
+                "form-1-name": "",
+                "form-1-age": "x",
+            }
+        )
+
+    def test_summary(self):
+        formset = self.get_formset()
+        output = pformat_django_context_html(formset)
+        self.assertEqual(output.count("&lt;PersonForm: prefix="), 2)
+        self.assertIn(
+            "&lt;PersonForm: prefix=&#x27;form-0&#x27;, bound, 2 fields, not validated&gt;", output
+        )
+        self.assertIn("<strong>errors</strong>: &lt;not validated yet&gt;", output)
+        self.assertIsNone(formset._errors)
+
+    def test_errors(self):
+        formset = self.get_formset()
+        self.assertFalse(formset.is_valid())
+        output = pformat_django_context_html(formset)
+        self.assertIn("prefix=&#x27;form-0&#x27;, bound, 2 fields, valid&gt;", output)
+        self.assertIn("prefix=&#x27;form-1&#x27;, bound, 2 fields, errors in name, age&gt;", output)
+
+    def test_full(self):
+        formset = self.get_formset()
+        output = pformat_django_context_html(formset, full=True)
+        self.assertIn("<strong>widgets</strong>", output)
+        self.assertIn("name=&quot;form-1-name&quot;", output)
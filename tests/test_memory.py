@@ -0,0 +1,47 @@
+import sys
+
+from django.test import SimpleTestCase
+from django.utils.functional import SimpleLazyObject
+
+from debugtools.utils.memory import get_context_sizes, get_deep_size
+
+
+class GetDeepSizeTests(SimpleTestCase):
+    def test_nested(self):
+        value = ["a" * 100, {"key": "b" * 200}]
+        size, complete = get_deep_size(value)
+        self.assertTrue(complete)
+        self.assertGreater(size, sys.getsizeof(value) + 300)
+
+    def test_cycle(self):
+        value = []
+        value.append(value)
+        self.assertEqual(get_deep_size(value), (sys.getsizeof(value), True))
+
+    def test_shared_objects(self):
+        # Objects that are referenced twice are only counted once.
+        item = "x" * 1000
+        size, complete = get_deep_size([item, item])
+        self.assertEqual(size, sys.getsizeof([item, item]) + sys.getsizeof(item))
+
+    def test_max_nodes(self):
+        value = [object() for _ in range(100)]
+        size, complete = get_deep_size(value, max_nodes=10)
+        self.assertFalse(complete)
+        self.assertGreater(size, 0)
+
+    def test_lazy_object(self):
+        # The lazy object is not evaluated.
+        def _setup():
+            raise AssertionError("evaluated")
+
+        size, complete = get_deep_size(SimpleLazyObject(_setup))
+        self.assertTrue(complete)
+
+
+class GetContextSizesTests(SimpleTestCase):
+    def test_order(self):
+        sizes = get_context_sizes({"small": 1, "large": "x" * 1000})
+        self.assertEqual([item["key"] for item in sizes], ["large", "small"])
+        self.assertEqual(sizes[0]["type"], "str")
+        self.assertTrue(sizes[0]["complete"])
@@ -0,0 +1,81 @@
+from django.contrib.auth.models import Group, Permission
+from django.http import HttpResponse
+from django.template import Context, Engine
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from debugtools.middleware.queryattributionmiddleware import QueryAttributionMiddleware
+from debugtools.utils.queries import group_queries
+
+TEMPLATE = """{% for permission in permissions %}
+  {{ permission.codename }}
+{% endfor %}
+{{ groups.count }}
+"""
+
+
+def _query(template, lineno, sql="SELECT 1", time=0.001):
+    return {
+        "sql": sql,
+        "time": time,
+        "template": template,
+        "lineno": lineno,
+        "expression": "{{ value }}",
+    }
+
+
+class GroupQueriesTests(SimpleTestCase):
+    def test_group(self):
+        queries = [
+            _query("a.html", 1),
+            _query("b.html", 2, sql="SELECT 2"),
+            _query("b.html", 2, sql="SELECT 3"),
+            _query(None, None),
+        ]
+        groups = group_queries(queries)
+        self.assertEqual(
+            [(group["template"], group["lineno"], group["count"]) for group in groups],
+            [("b.html", 2, 2), ("a.html", 1, 1), (None, None, 1)],
+        )
+
+        # The first query is kept as example.
+        self.assertEqual(groups[0]["sql"], "SELECT 2")
+        self.assertAlmostEqual(groups[0]["time"], 0.002)
+
+    def test_order_by_time(self):
+        groups = group_queries([_query("a.html", 1, time=0.1), _query("b.html", 1, time=0.5)])
+        self.assertEqual([group["template"] for group in groups], ["b.html", "a.html"])
+
+    def test_empty(self):
+        self.assertEqual(group_queries([]), [])
+
+
+class QueryAttributionMiddlewareTests(TestCase):
+    def _get_response(self, request):
+        engine = Engine(
+            loaders=[("django.template.loaders.locmem.Loader", {"queries.html": TEMPLATE})]
+        )
+        context = Context(
+            {"permissions": Permission.objects.all()[:2], "groups": Group.objects.all()}
+        )
+        return HttpResponse(engine.get_template("queries.html").render(context))
+
+    @override_settings(DEBUG=True)
+    def test_template_location(self):
+        request = RequestFactory().get("/")
+        QueryAttributionMiddleware(self._get_response)(request)
+
+        queries = request._query_recorder.queries
+        self.assertEqual(
+            [(query["template"], query["lineno"], query["expression"]) for query in queries],
+            [
+                ("queries.html", 1, "{% for permission in permissions %}"),
+                ("queries.html", 4, "{{ groups.count }}"),
+            ],
+        )
+        self.assertIn("auth_permission", queries[0]["sql"])
+        self.assertIn("COUNT", queries[1]["sql"])
+
+    def test_no_debug(self):
+        request = RequestFactory().get("/")
+        QueryAttributionMiddleware(self._get_response)(request)
+        self.assertFalse(hasattr(request, "_query_recorder"))
@@ -0,0 +1,61 @@
+from django.test import SimpleTestCase
+
+from debugtools.utils.stats import StatisticsRegistry, _percentile
+
+
+class StatisticsRegistryTests(SimpleTestCase):
+    def test_add(self):
+        registry = StatisticsRegistry()
+        registry.add("app.views.home", "home.html", 10.0, 2, template_choices=["home.html"])
+        registry.add("app.views.home", "home.html", 30.0, 4, template_choices=["home.html"])
+
+        (view,) = registry.get_view_stats()
+        self.assertEqual(view["name"], "app.views.home")
+        self.assertEqual(view["hits"], 2)
+        self.assertEqual(view["mean"], 20.0)
+        self.assertEqual(view["p95"], 30.0)
+        self.assertEqual(view["queries"], 6)
+        self.assertEqual(view["mean_queries"], 3.0)
+        self.assertEqual(view["template_choices"], [("home.html", 2)])
+
+        (template,) = registry.get_template_stats()
+        self.assertEqual(template["name"], "home.html")
+        self.assertEqual(template["hits"], 2)
+        self.assertEqual(template["template_choices"], [])
+
+    def test_unknown_queries(self):
+        # With DEBUG = False, the queries are not counted.
+        registry = StatisticsRegistry()
+        registry.add("app.views.home", None, 10.0, None)
+        (view,) = registry.get_view_stats()
+        self.assertIsNone(view["queries"])
+        self.assertIsNone(view["mean_queries"])
+
+        registry.add("app.views.home", None, 10.0, 4)
+        (view,) = registry.get_view_stats()
+        self.assertEqual(view["hits"], 2)
+        self.assertEqual(view["mean_queries"], 4.0)
+
+    def test_lru(self):
+        registry = StatisticsRegistry(max_entries=2)
+        registry.add("a", None, 1.0, 0)
+        registry.add("b", None, 1.0, 0)
+        registry.add("a", None, 1.0, 0)  # "b" is now the least recently used.
+        registry.add("c", None, 1.0, 0)
+
+        names = sorted(stats["name"] for stats in registry.get_view_stats())
+        self.assertEqual(names, ["a", "c"])
+
+    def test_clear(self):
+        registry = StatisticsRegistry()
+        registry.add("a", "a.html", 1.0, 0)
+        registry.clear()
+        self.assertEqual(registry.get_view_stats(), [])
+        self.assertEqual(registry.get_template_stats(), [])
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(_percentile(values, 95), 95)
+        self.assertEqual(_percentile(values, 100), 100)
+        self.assertEqual(_percentile([5], 95), 5)
+        self.assertEqual(_percentile([1, 2], 0), 1)
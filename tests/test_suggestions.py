@@ -0,0 +1,32 @@
+from django.test import SimpleTestCase
+
+from debugtools.utils.suggestions import KeyIndex
+
+
+class KeyIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = KeyIndex(["object", "object_list", "obj", "request", "user", "users", 1])
+
+    def test_keys(self):
+        self.assertEqual(
+            self.index.keys, ["1", "obj", "object", "object_list", "request", "user", "users"]
+        )
+
+    def test_typo(self):
+        self.assertEqual(self.index.suggest("reqeust"), ["request"])
+        self.assertEqual(self.index.suggest("objetc")[0], "object")
+
+    def test_closest_first(self):
+        self.assertEqual(self.index.suggest("usr"), ["user"])
+        self.assertEqual(self.index.suggest("userz"), ["user", "users"])
+
+    def test_prefix(self):
+        # Longer names which start with the word are suggested too, shortest first.
+        self.assertEqual(self.index.suggest("object_"), ["object", "object_list"])
+
+    def test_limit(self):
+        self.assertEqual(len(self.index.suggest("o", max_distance=10, limit=2)), 2)
+
+    def test_no_match(self):
+        self.assertEqual(self.index.suggest("zzzzzz"), [])
+        self.assertEqual(KeyIndex([]).suggest("user"), [])
@@ -0,0 +1,136 @@
+import json
+import re
+
+from django.template import engines
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from debugtools.templatetags import debugtools_tags
+
+
+def _render(template_code, context=None):
+    return engines["django"].from_string(template_code).render(context or {})
+
+
+def _get_available(output):
+    return re.findall(r"Available context variables are:\s*(.*?)[<\n]", output)
+
+
+class PrintNotFoundTests(SimpleTestCase):
+    def test_suggestion(self):
+        output = _render("{% print reqeust %}", {"request": 1})
+        self.assertIn("Did you mean: request?", output)
+
+    def test_key_index_scopes(self):
+        # The key index is cached per template, but must not be reused for a new scope.
+        # The scope of the first {% with %} is freed, so the second one may get the same id().
+        output = _render(
+            "{% with aaa=1 %}{% print bbb %}{% endwith %}"
+            "{% with ccc=1 %}{% print bbb %}{% endwith %}"
+        )
+        available = _get_available(output)
+        self.assertEqual(len(available), 2)
+        self.assertIn("aaa", available[0])
+        self.assertNotIn("ccc", available[0])
+        self.assertIn("ccc", available[1])
+        self.assertNotIn("aaa", available[1])
+
+
+class PrintContextTests(SimpleTestCase):
+    def test_html(self):
+        output = _render("{% print_context %}", {"value": "<b>"})
+        self.assertIn("<strong>value</strong>: &#x27;&lt;b&gt;&#x27;", output)
+
+    @override_settings(DEBUGTOOLS_CLIENT_RENDER_ROWS=5)
+    def test_client_side(self):
+        output = _render("{% print_context %}", {"items": list(range(100)), "value": "<b>"})
+        self.assertIn("data-debugtools-kind='tree'", output)
+
+        # The payload has the plain text, the HTML is generated by jquery.debug.js
+        payload = re.search(r'<script [^>]*type="application/json">(.*?)</script>', output).group(
+            1
+        )
+        label, items, is_open = json.loads(payload)[0]
+        self.assertEqual(label, "0:")
+        self.assertEqual(items[1], ["value", "str", "'<b>'"])
+        self.assertEqual(items[0][:2], ["items", "list"])
+        self.assertTrue(items[0][2].startswith("[0,\n"))
+
+
+class PrintStylesheetTests(SimpleTestCase):
+    def test_once(self):
+        output = _render("{% print value %}{% print value %}", {"value": "<b>"})
+        self.assertEqual(output.count("<style"), 1)
+        self.assertEqual(output.count("<pre"), 2)
+        self.assertNotRegex(output, r"<pre[^>]* style=")
+
+
+@override_settings(DEBUGTOOLS_CLIENT_RENDER_ROWS=5)
+class PrintVariableClientSideTests(SimpleTestCase):
+    def get_payload(self, output):
+        payload = re.search(r'<script [^>]*type="application/json">(.*?)</script>', output).group(
+            1
+        )
+        return json.loads(payload)
+
+    def test_list(self):
+        output = _render("{% print items %}", {"items": ["a", "<b>"] * 10})
+        self.assertIn("data-debugtools-kind='tree'", output)
+        ((label, items, is_open),) = self.get_payload(output)
+        self.assertEqual(label, "items = list:")
+        self.assertEqual(len(items), 20)
+        self.assertEqual(items[1], ["1", "str", "'<b>'"])
+
+    def test_nested(self):
+        # A few items with many rows.
+        output = _render("{% print data %}", {"data": {"a": list(range(100))}})
+        ((label, items, is_open),) = self.get_payload(output)
+        self.assertEqual(label, "data = dict:")
+        self.assertEqual(items[0][:2], ["a", "list"])
+
+    def test_small(self):
+        output = _render("{% print items %}", {"items": [1, 2]})
+        self.assertNotIn("data-debugtools-payload", output)
+        self.assertIn("[1, 2]", output)
+
+
+class PrintContextDiffTests(SimpleTestCase):
+    def setUp(self):
+        debugtools_tags._fingerprints.clear()
+
+    def _get_scopes(self, output):
+        return re.findall(r"<a href='#'[^>]*>(\d+):</a></small><span>(.*?)</span>", output)
+
+    def test_changes(self):
+        # Only the keys each scope adds or overrides are printed.
+        output = _render(
+            "{% with a=1 b=2 %}{% with a=3 c=4 %}{% print_context diff %}{% endwith %}{% endwith %}",
+            {"top": 5},
+        )
+        scopes = dict(self._get_scopes(output))
+        self.assertEqual(scopes["0"], "   <strong>a</strong>: 3<br/>   <strong>c</strong>: 4")
+        self.assertEqual(scopes["1"], "   <strong>a</strong>: 1<br/>   <strong>b</strong>: 2")
+        self.assertEqual(scopes["2"], "   <strong>top</strong>: 5")
+
+    def test_same_object(self):
+        # Shadowing a key with the same object is not a change.
+        output = _render(
+            "{% with value=value %}{% with other=1 %}{% print_context diff %}{% endwith %}{% endwith %}",
+            {"value": object()},
+        )
+        scopes = dict(self._get_scopes(output))
+        self.assertNotIn("1", scopes)
+        self.assertIn("<strong>value</strong>", scopes["2"])
+
+    def test_unchanged_processors(self):
+        template = engines["django"].from_string(
+            "{% print_context diff %}{% print_context diff %}"
+        )
+        request = RequestFactory().get("/")
+
+        # The second tag in the same request doesn't claim a previous request.
+        output = template.render({"value": 1}, request)
+        self.assertNotIn("unchanged since a previous request", output)
+
+        output = template.render({"value": 1}, request)
+        self.assertEqual(output.count("unchanged since a previous request: True, False, None"), 2)
+        self.assertIn("<strong>value</strong>: 1", output)